@@ -0,0 +1,65 @@
+"""Release notes lookup shared by the release scripts.
+
+Notes for a tag are the lines between its `## [tag]` heading in CHANGELOG.md and
+the next `## [` heading.
+"""
+
+from __future__ import annotations
+
+import functools
+from pathlib import Path
+
+
+@functools.lru_cache(maxsize=None)
+def load_changelog_index(
+    path: str, mtime_ns: int
+) -> tuple[str, dict[str, tuple[int, int]]]:
+    """Map each `## [tag]` heading to the character range of its section.
+
+    Keyed on the modification time so an edited changelog is re-read.
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    sections: dict[str, tuple[int, int]] = {}
+    open_tags: list[str] = []
+    # Jump between "## [" occurrences instead of materializing every line.
+    pos = text.find("## [")
+    while pos != -1:
+        line_start = text.rfind("\n", 0, pos) + 1
+        line_end = text.find("\n", pos)
+        if line_end == -1:
+            line_end = len(text)
+
+        if pos == line_start:
+            for tag in open_tags:
+                sections[tag] = (sections[tag][0], line_start)
+            open_tags.clear()
+
+        heading = text[line_start:line_end].strip()
+        if heading.startswith("## [") and heading.endswith("]"):
+            tag = heading[len("## [") : -1]
+            if tag not in sections:
+                sections[tag] = (line_end + 1, len(text))
+                open_tags.append(tag)
+
+        pos = text.find("## [", line_end)
+    return text, sections
+
+
+def index_changelog(changelog_path: Path) -> tuple[str, dict[str, tuple[int, int]]]:
+    if not changelog_path.exists():
+        raise RuntimeError(f"Missing changelog: {changelog_path}")
+    return load_changelog_index(
+        str(changelog_path.resolve()), changelog_path.stat().st_mtime_ns
+    )
+
+
+def extract_notes(changelog_path: Path, tag: str) -> str:
+    text, sections = index_changelog(changelog_path)
+    if tag not in sections:
+        raise RuntimeError(f"No changelog heading found for {tag}")
+
+    start, end = sections[tag]
+    section = text[start:end].strip()
+    if not section:
+        section = "- Maintenance release."
+    return section
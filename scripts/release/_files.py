@@ -0,0 +1,53 @@
+"""Filesystem helpers shared by the release scripts."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def default_cache_dir(name: str) -> Path:
+    base = os.environ.get("XDG_CACHE_HOME", "").strip()
+    root = Path(base) if base else Path.home() / ".cache"
+    return root / name
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A plain open() keeps the usual umask-derived mode, unlike tempfile.mkstemp.
+    temp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    new_bytes = content.encode("utf-8")
+    # A size mismatch proves the file changed without reading it back.
+    if path.exists() and path.stat().st_size == len(new_bytes):
+        if path.read_bytes() == new_bytes:
+            return False
+    write_atomic(path, new_bytes)
+    return True
+
+
+def sha256_of_stream(stream) -> str:
+    if hasattr(hashlib, "file_digest"):
+        # Python 3.11+: the read/update loop runs inside hashlib.
+        return hashlib.file_digest(stream, "sha256").hexdigest()
+
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        size = stream.readinto(buffer)
+        if not size:
+            break
+        digest.update(view[:size])
+    return digest.hexdigest()
@@ -0,0 +1,108 @@
+"""GitHub releases API helpers shared by the release scripts."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from _files import write_atomic
+
+
+def build_api_headers(user_agent: str, github_token: str | None) -> dict[str, str]:
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "User-Agent": user_agent,
+    }
+    if github_token:
+        headers["Authorization"] = f"Bearer {github_token}"
+    return headers
+
+
+def parse_sha256_digest(raw: object) -> str | None:
+    if raw is None:
+        return None
+    value = str(raw).strip().lower()
+    if value.startswith("sha256:"):
+        value = value.removeprefix("sha256:")
+    if re.fullmatch(r"[0-9a-f]{64}", value):
+        return value
+    return None
+
+
+def releases_cache_paths(cache_dir: Path, repo: str) -> tuple[Path, Path]:
+    stem = repo.replace("/", "__")
+    return (
+        cache_dir / f"{stem}.releases.json",
+        cache_dir / f"{stem}.releases.etag",
+    )
+
+
+def fetch_releases_payload(
+    repo: str,
+    headers: dict[str, str],
+    cache_dir: Path | None,
+    timeout: float,
+    cache_ttl: float = 0,
+    force_refresh: bool = False,
+) -> list[dict]:
+    """Return the raw releases list, revalidating a cached copy with its ETag.
+
+    Passing cache_dir=None always downloads the full list and stores nothing.
+    """
+    url = f"https://api.github.com/repos/{repo}/releases?per_page=100"
+    headers = dict(headers)
+
+    payload_path = etag_path = None
+    if cache_dir is not None:
+        payload_path, etag_path = releases_cache_paths(cache_dir, repo)
+        if not force_refresh and cache_ttl > 0 and payload_path.exists():
+            age = time.time() - payload_path.stat().st_mtime
+            if age < cache_ttl:
+                print(f"Using cached releases for {repo} ({int(age)}s old).")
+                with payload_path.open("rb") as handle:
+                    return json.load(handle)
+
+        if not force_refresh and payload_path.exists() and etag_path.exists():
+            etag = etag_path.read_text(encoding="utf-8").strip()
+            if etag:
+                headers["If-None-Match"] = etag
+
+    req = urllib.request.Request(url, headers=headers)
+
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            body = response.read()
+            etag = response.headers.get("ETag")
+    except urllib.error.HTTPError as exc:
+        if exc.code != 304 or payload_path is None:
+            raise RuntimeError(f"Failed to fetch releases from {repo}: {exc}") from exc
+        # Not modified: GitHub does not count 304s against the primary rate limit.
+        print(f"Releases for {repo} not modified; using cached payload.")
+        with payload_path.open("rb") as handle:
+            payload = json.load(handle)
+        try:
+            # Restart the TTL window now that GitHub confirmed the cache is current.
+            os.utime(payload_path)
+        except OSError:
+            pass
+        return payload
+    except urllib.error.URLError as exc:
+        raise RuntimeError(f"Failed to fetch releases from {repo}: {exc}") from exc
+
+    # json accepts UTF-8 bytes directly, so skip materializing a decoded str copy.
+    payload = json.loads(body)
+    if payload_path is not None:
+        try:
+            write_atomic(payload_path, body)
+            if etag:
+                write_atomic(etag_path, etag.encode("utf-8"))
+            else:
+                etag_path.unlink(missing_ok=True)
+        except OSError as exc:
+            print(f"Warning: could not update releases cache in {cache_dir}: {exc}")
+    return payload
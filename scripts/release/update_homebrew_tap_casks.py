@@ -6,27 +6,115 @@ Policy:
 - Beta cask tracks whichever is newer between latest stable and latest prerelease.
   This keeps beta-channel users moving forward even when stable surpasses beta.
 - Beta artifacts install side-by-side as Dockmint Beta.app.
+- Cask sha256 values come from the release asset `digest` reported by the
+  GitHub API. Assets without one are always reported; they are downloaded and
+  hashed unless a checksum from an earlier run covers the same URL and size.
 """
 
 from __future__ import annotations
 
 import argparse
 import dataclasses
-import hashlib
+import functools
 import json
 import os
 import re
+import ssl
+import string
 import sys
-import urllib.error
+import time
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from _files import (
+    default_cache_dir,
+    sha256_of_stream,
+    write_atomic,
+    write_if_changed,
+)
+from _github import build_api_headers, fetch_releases_payload, parse_sha256_digest
 
-STABLE_TAG_RE = re.compile(r"^v(\d+)\.(\d+)\.(\d+)$")
-PRERELEASE_TAG_RE = re.compile(r"^v(\d+)\.(\d+)\.(\d+)-([0-9A-Za-z.-]+)$")
 
+TAG_RE = re.compile(
+    r"^v(?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+)(?:-(?P<prerelease>[0-9A-Za-z.-]+))?$"
+)
+PRERELEASE_SEPARATORS = str.maketrans("-", ".")
+MAX_PARALLEL_DOWNLOADS = 4
+SHA_CACHE_MAX_AGE = 30 * 24 * 60 * 60
 
-@dataclasses.dataclass(frozen=True)
+
+CASK_TEMPLATE = string.Template(
+    """cask "$token" do
+  version "$version"
+
+  on_arm do
+    url "$arm_url"
+    sha256 "$arm_sha256"
+  end
+
+  on_intel do
+    url "$intel_url"
+    sha256 "$intel_sha256"
+  end
+
+  name "$name"
+  desc "$desc"
+  homepage "https://github.com/$repo"
+
+$livecheck
+  app "$app"
+
+  zap trash: [
+$zap  ]
+end
+"""
+)
+STABLE_LIVECHECK = """  livecheck do
+    url :url
+    strategy :github_latest
+  end
+"""
+BETA_LIVECHECK_TEMPLATE = string.Template(
+    """  livecheck do
+    url "https://api.github.com/repos/$repo/releases"
+    strategy :json do |json|
+      json
+        .reject { |release| release["draft"] }
+        .map { |release| release["tag_name"] }
+    end
+  end
+"""
+)
+STABLE_ZAP_PATHS = (
+    "~/Library/Application Support/Dockmint",
+    "~/Library/Application Support/Docktor",
+    "~/Library/Caches/pzc.Dockter",
+    "~/Library/Caches/pzc.Dockmint",
+    "~/Library/Logs/Dockmint",
+    "~/Library/Preferences/pzc.Dockter.plist",
+    "~/Library/Preferences/pzc.Dockmint.plist",
+    "~/Library/Saved Application State/pzc.Dockter.savedState",
+    "~/Library/Saved Application State/pzc.Dockmint.savedState",
+    "~/Code/Dockmint/logs",
+    "~/Code/Docktor/logs",
+)
+BETA_ZAP_PATHS = (
+    "~/Library/Application Support/Dockmint Beta",
+    "~/Library/Application Support/Docktor Beta",
+    "~/Library/Caches/pzc.Dockter.beta",
+    "~/Library/Caches/pzc.Dockmint.beta",
+    "~/Library/Logs/Dockmint",
+    "~/Library/Preferences/pzc.Dockter.beta.plist",
+    "~/Library/Preferences/pzc.Dockmint.beta.plist",
+    "~/Library/Saved Application State/pzc.Dockter.beta.savedState",
+    "~/Library/Saved Application State/pzc.Dockmint.beta.savedState",
+    "~/Code/Dockmint/logs",
+    "~/Code/Docktor/logs",
+)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class ParsedTag:
     major: int
     minor: int
@@ -34,16 +122,16 @@ class ParsedTag:
     prerelease: str | None
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class Release:
     tag_name: str
     draft: bool
     prerelease_flag: bool
-    assets: tuple["ReleaseAsset", ...]
+    assets_by_name: dict[str, "ReleaseAsset"] = dataclasses.field(hash=False)
     parsed: ParsedTag
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True)
 class ReleaseAsset:
     name: str
     download_url: str
@@ -52,27 +140,21 @@ class ReleaseAsset:
 
 
 def parse_tag(tag: str) -> ParsedTag | None:
-    stable = STABLE_TAG_RE.match(tag)
-    if stable:
-        return ParsedTag(
-            int(stable.group(1)), int(stable.group(2)), int(stable.group(3)), None
-        )
-
-    prerelease = PRERELEASE_TAG_RE.match(tag)
-    if prerelease:
-        return ParsedTag(
-            int(prerelease.group(1)),
-            int(prerelease.group(2)),
-            int(prerelease.group(3)),
-            prerelease.group(4),
-        )
-
-    return None
+    match = TAG_RE.match(tag)
+    if match is None:
+        return None
+    return ParsedTag(
+        int(match["major"]),
+        int(match["minor"]),
+        int(match["patch"]),
+        match["prerelease"],
+    )
 
 
+@functools.lru_cache(maxsize=None)
 def prerelease_key(prerelease: str) -> tuple[tuple[int, int | str], ...]:
     tokens: list[tuple[int, int | str]] = []
-    for part in re.split(r"[.-]", prerelease):
+    for part in prerelease.translate(PRERELEASE_SEPARATORS).split("."):
         if part.isdigit():
             tokens.append((0, int(part)))
         else:
@@ -80,6 +162,10 @@ def prerelease_key(prerelease: str) -> tuple[tuple[int, int | str], ...]:
     return tuple(tokens)
 
 
+# SemVer precedence is implemented here rather than via packaging.version: PEP 440
+# rejects tags like "-nightly.1", orders "-dev" ahead of "-beta", and the release
+# runners only provide the standard library.
+@functools.lru_cache(maxsize=None)
 def version_key(
     parsed: ParsedTag,
 ) -> tuple[int, int, int, int, tuple[tuple[int, int | str], ...]]:
@@ -88,76 +174,73 @@ def version_key(
     return (parsed.major, parsed.minor, parsed.patch, is_stable, suffix)
 
 
-def parse_sha256_digest(raw: object) -> str | None:
-    if raw is None:
-        return None
-    value = str(raw).strip().lower()
-    if value.startswith("sha256:"):
-        value = value.removeprefix("sha256:")
-    if re.fullmatch(r"[0-9a-f]{64}", value):
-        return value
-    return None
-
-
-def build_api_headers(user_agent: str, github_token: str | None) -> dict[str, str]:
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": user_agent,
-    }
-    if github_token:
-        headers["Authorization"] = f"Bearer {github_token}"
-    return headers
+def fetch_releases(
+    repo: str,
+    github_token: str | None,
+    cache_dir: Path,
+    cache_ttl: float = 0,
+    force_refresh: bool = False,
+) -> list[dict]:
+    headers = build_api_headers(
+        user_agent="dockmint-homebrew-sync", github_token=github_token
+    )
+    return fetch_releases_payload(
+        repo,
+        headers,
+        cache_dir,
+        timeout=20,
+        cache_ttl=cache_ttl,
+        force_refresh=force_refresh,
+    )
 
 
-def fetch_releases(repo: str, github_token: str | None) -> list[Release]:
-    url = f"https://api.github.com/repos/{repo}/releases"
-    req = urllib.request.Request(
-        url,
-        headers=build_api_headers(
-            user_agent="dockmint-homebrew-sync", github_token=github_token
-        ),
+def build_release(item: dict, parsed: ParsedTag) -> Release:
+    assets = (
+        ReleaseAsset(
+            name=str(asset.get("name", "")),
+            download_url=str(asset.get("browser_download_url", "")),
+            size=int(asset.get("size", 0)),
+            sha256=parse_sha256_digest(asset.get("digest")),
+        )
+        for asset in item.get("assets", [])
+    )
+    return Release(
+        tag_name=item.get("tag_name", ""),
+        draft=bool(item.get("draft", False)),
+        prerelease_flag=bool(item.get("prerelease", False)),
+        assets_by_name={asset.name: asset for asset in assets},
+        parsed=parsed,
     )
 
-    try:
-        with urllib.request.urlopen(req, timeout=20) as response:
-            payload = json.loads(response.read().decode("utf-8"))
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"Failed to fetch releases from {repo}: {exc}") from exc
 
-    output: list[Release] = []
+def pick_latest_by_channel(
+    payload: list[dict],
+) -> tuple[Release | None, Release | None]:
+    """Return the newest stable and newest prerelease in a single pass.
+
+    GitHub orders releases by creation date rather than version, so every tag
+    is compared, but assets are only parsed for the two releases selected.
+    """
+    stable: tuple[dict, ParsedTag] | None = None
+    prerelease: tuple[dict, ParsedTag] | None = None
     for item in payload:
-        tag = item.get("tag_name", "")
-        parsed = parse_tag(tag)
+        if item.get("draft", False):
+            continue
+        parsed = parse_tag(item.get("tag_name", ""))
         if parsed is None:
             continue
 
-        assets = tuple(
-            ReleaseAsset(
-                name=str(asset.get("name", "")),
-                download_url=str(asset.get("browser_download_url", "")),
-                size=int(asset.get("size", 0)),
-                sha256=parse_sha256_digest(asset.get("digest")),
-            )
-            for asset in item.get("assets", [])
-        )
-
-        output.append(
-            Release(
-                tag_name=tag,
-                draft=bool(item.get("draft", False)),
-                prerelease_flag=bool(item.get("prerelease", False)),
-                assets=assets,
-                parsed=parsed,
-            )
-        )
-
-    return [release for release in output if not release.draft]
-
+        key = version_key(parsed)
+        if parsed.prerelease is None:
+            if stable is None or key > version_key(stable[1]):
+                stable = (item, parsed)
+        elif prerelease is None or key > version_key(prerelease[1]):
+            prerelease = (item, parsed)
 
-def pick_latest(releases: list[Release]) -> Release | None:
-    if not releases:
-        return None
-    return max(releases, key=lambda release: version_key(release.parsed))
+    return (
+        build_release(*stable) if stable is not None else None,
+        build_release(*prerelease) if prerelease is not None else None,
+    )
 
 
 def version_string(parsed: ParsedTag) -> str:
@@ -169,9 +252,9 @@ def version_string(parsed: ParsedTag) -> str:
 
 def find_asset(release: Release, *names: str) -> ReleaseAsset:
     for name in names:
-        for asset in release.assets:
-            if asset.name == name:
-                return asset
+        asset = release.assets_by_name.get(name)
+        if asset is not None:
+            return asset
     attempted = ", ".join(repr(name) for name in names)
     raise RuntimeError(
         f"None of the assets [{attempted}] were found in release {release.tag_name}"
@@ -192,37 +275,97 @@ def beta_asset_names(version: str, arch: str) -> tuple[str, ...]:
     )
 
 
-def sha256_for_asset(
-    asset: ReleaseAsset, github_token: str | None, cache: dict[str, str]
-) -> str:
+def download_sha256(asset: ReleaseAsset) -> str:
+    # Casks point at public browser_download_url links that Homebrew fetches
+    # anonymously, so skip the token and keep downloads off the API quota.
+    request = urllib.request.Request(
+        asset.download_url,
+        headers={
+            "Accept": "application/octet-stream",
+            "User-Agent": "dockmint-homebrew-sha256",
+        },
+    )
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return sha256_of_stream(response)
+
+
+def asset_cache_key(asset: ReleaseAsset) -> str:
+    # Including the size invalidates the entry if an asset is re-uploaded.
+    return f"{asset.download_url}|{asset.size}"
+
+
+def load_sha_cache(path: Path) -> dict[str, dict]:
+    try:
+        with path.open("rb") as handle:
+            entries = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(entries, dict):
+        return {}
+
+    cutoff = time.time() - SHA_CACHE_MAX_AGE
+    return {
+        key: entry
+        for key, entry in entries.items()
+        if isinstance(entry, dict)
+        and isinstance(entry.get("sha256"), str)
+        and isinstance(entry.get("seen"), (int, float))
+        and entry["seen"] >= cutoff
+    }
+
+
+def save_sha_cache(
+    path: Path, entries: dict[str, dict], cache: dict[str, str], used: set[str]
+) -> None:
+    now = time.time()
+    for key, sha256 in cache.items():
+        if key in used or key not in entries:
+            entries[key] = {"sha256": sha256, "seen": now}
+    try:
+        write_atomic(path, json.dumps(entries, indent=2, sort_keys=True).encode("utf-8"))
+    except OSError as exc:
+        print(f"Warning: could not update sha256 cache at {path}: {exc}")
+
+
+def sha256_for_asset(asset: ReleaseAsset, cache: dict[str, str]) -> str:
     if asset.sha256 is not None:
         return asset.sha256
 
-    if asset.download_url in cache:
-        return cache[asset.download_url]
+    key = asset_cache_key(asset)
+    if key in cache:
+        return cache[key]
 
     print(f"Computing sha256 for asset {asset.name} ...")
-    request = urllib.request.Request(
-        asset.download_url,
-        headers=build_api_headers(
-            user_agent="dockmint-homebrew-sha256", github_token=github_token
-        )
-        | {"Accept": "application/octet-stream"},
-    )
-    digest = hashlib.sha256()
-    with urllib.request.urlopen(request, timeout=120) as response:
-        while True:
-            chunk = response.read(1024 * 1024)
-            if not chunk:
-                break
-            digest.update(chunk)
-
-    resolved = digest.hexdigest()
-    cache[asset.download_url] = resolved
+    resolved = download_sha256(asset)
+    cache[key] = resolved
     return resolved
 
 
-def render_stable_cask(
+def prefetch_sha256(assets: list[ReleaseAsset], cache: dict[str, str]) -> None:
+    """Download and hash every asset lacking a published digest concurrently."""
+    pending: dict[str, ReleaseAsset] = {}
+    for asset in assets:
+        key = asset_cache_key(asset)
+        if asset.sha256 is None and key not in cache:
+            pending.setdefault(key, asset)
+
+    if not pending:
+        return
+
+    # hashlib uses OpenSSL's SHA-256; log the build so slow CI hashing is traceable.
+    print(f"Hashing {len(pending)} asset(s) with {ssl.OPENSSL_VERSION}")
+    for asset in pending.values():
+        print(f"Computing sha256 for asset {asset.name} ...")
+    # Results are merged on this thread, so workers never touch the shared cache.
+    with ThreadPoolExecutor(
+        max_workers=min(MAX_PARALLEL_DOWNLOADS, len(pending))
+    ) as executor:
+        digests = executor.map(download_sha256, pending.values())
+        cache.update(zip(pending, digests))
+
+
+def render_cask(
+    *,
     token: str,
     name: str,
     desc: str,
@@ -232,46 +375,51 @@ def render_stable_cask(
     arm_sha256: str,
     intel_url: str,
     intel_sha256: str,
+    livecheck: str,
+    app: str,
+    zap_paths: tuple[str, ...],
 ) -> str:
-    return f'''cask "{token}" do
-  version "{version}"
-
-  on_arm do
-    url "{arm_url}"
-    sha256 "{arm_sha256}"
-  end
-
-  on_intel do
-    url "{intel_url}"
-    sha256 "{intel_sha256}"
-  end
-
-  name "{name}"
-  desc "{desc}"
-  homepage "https://github.com/{repo}"
-
-  livecheck do
-    url :url
-    strategy :github_latest
-  end
+    return CASK_TEMPLATE.substitute(
+        token=token,
+        name=name,
+        desc=desc,
+        repo=repo,
+        version=version,
+        arm_url=arm_url,
+        arm_sha256=arm_sha256,
+        intel_url=intel_url,
+        intel_sha256=intel_sha256,
+        livecheck=livecheck,
+        app=app,
+        zap="".join(f'    "{path}",\n' for path in zap_paths),
+    )
 
-  app "Dockmint.app"
 
-  zap trash: [
-    "~/Library/Application Support/Dockmint",
-    "~/Library/Application Support/Docktor",
-    "~/Library/Caches/pzc.Dockter",
-    "~/Library/Caches/pzc.Dockmint",
-    "~/Library/Logs/Dockmint",
-    "~/Library/Preferences/pzc.Dockter.plist",
-    "~/Library/Preferences/pzc.Dockmint.plist",
-    "~/Library/Saved Application State/pzc.Dockter.savedState",
-    "~/Library/Saved Application State/pzc.Dockmint.savedState",
-    "~/Code/Dockmint/logs",
-    "~/Code/Docktor/logs",
-  ]
-end
-'''
+def render_stable_cask(
+    token: str,
+    name: str,
+    desc: str,
+    repo: str,
+    version: str,
+    arm_url: str,
+    arm_sha256: str,
+    intel_url: str,
+    intel_sha256: str,
+) -> str:
+    return render_cask(
+        token=token,
+        name=name,
+        desc=desc,
+        repo=repo,
+        version=version,
+        arm_url=arm_url,
+        arm_sha256=arm_sha256,
+        intel_url=intel_url,
+        intel_sha256=intel_sha256,
+        livecheck=STABLE_LIVECHECK,
+        app="Dockmint.app",
+        zap_paths=STABLE_ZAP_PATHS,
+    )
 
 
 def render_beta_cask(
@@ -285,57 +433,20 @@ def render_beta_cask(
     intel_url: str,
     intel_sha256: str,
 ) -> str:
-    return f'''cask "{token}" do
-  version "{version}"
-
-  on_arm do
-    url "{arm_url}"
-    sha256 "{arm_sha256}"
-  end
-
-  on_intel do
-    url "{intel_url}"
-    sha256 "{intel_sha256}"
-  end
-
-  name "{name}"
-  desc "{desc}"
-  homepage "https://github.com/{repo}"
-
-  livecheck do
-    url "https://api.github.com/repos/{repo}/releases"
-    strategy :json do |json|
-      json
-        .reject {{ |release| release["draft"] }}
-        .map {{ |release| release["tag_name"] }}
-    end
-  end
-
-  app "Dockmint Beta.app"
-
-  zap trash: [
-    "~/Library/Application Support/Dockmint Beta",
-    "~/Library/Application Support/Docktor Beta",
-    "~/Library/Caches/pzc.Dockter.beta",
-    "~/Library/Caches/pzc.Dockmint.beta",
-    "~/Library/Logs/Dockmint",
-    "~/Library/Preferences/pzc.Dockter.beta.plist",
-    "~/Library/Preferences/pzc.Dockmint.beta.plist",
-    "~/Library/Saved Application State/pzc.Dockter.beta.savedState",
-    "~/Library/Saved Application State/pzc.Dockmint.beta.savedState",
-    "~/Code/Dockmint/logs",
-    "~/Code/Docktor/logs",
-  ]
-end
-'''
-
-
-def write_if_changed(path: Path, content: str) -> bool:
-    existing = path.read_text(encoding="utf-8") if path.exists() else None
-    if existing == content:
-        return False
-    path.write_text(content, encoding="utf-8")
-    return True
+    return render_cask(
+        token=token,
+        name=name,
+        desc=desc,
+        repo=repo,
+        version=version,
+        arm_url=arm_url,
+        arm_sha256=arm_sha256,
+        intel_url=intel_url,
+        intel_sha256=intel_sha256,
+        livecheck=BETA_LIVECHECK_TEMPLATE.substitute(repo=repo),
+        app="Dockmint Beta.app",
+        zap_paths=BETA_ZAP_PATHS,
+    )
 
 
 def main() -> int:
@@ -354,7 +465,7 @@ def main() -> int:
     parser.add_argument(
         "--github-token",
         default=os.environ.get("GITHUB_TOKEN", "").strip() or None,
-        help="GitHub token for API and asset download requests (defaults to GITHUB_TOKEN env var)",
+        help="GitHub token for API requests (defaults to GITHUB_TOKEN env var)",
     )
     parser.add_argument(
         "--legacy-alias-mode",
@@ -362,15 +473,38 @@ def main() -> int:
         default=os.environ.get("DOCKMINT_LEGACY_HOMEBREW_ALIAS_MODE", "remove"),
         help="Whether to keep or remove legacy docktor Homebrew alias casks",
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=default_cache_dir("dockmint-homebrew"),
+        help="Directory for cached GitHub release metadata and asset checksums (defaults to $XDG_CACHE_HOME/dockmint-homebrew)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0,
+        help="Reuse cached release metadata younger than this many seconds without contacting GitHub (default: 0, always revalidate)",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="Ignore cached release metadata and previously computed checksums",
+    )
+    parser.add_argument(
+        "--require-api-digest",
+        action="store_true",
+        help="Fail when the GitHub API omits the sha256 digest of a selected asset, even if a cached checksum is available",
+    )
     args = parser.parse_args()
 
-    releases = fetch_releases(args.repo, github_token=args.github_token)
-    stable = pick_latest(
-        [release for release in releases if release.parsed.prerelease is None]
-    )
-    prerelease = pick_latest(
-        [release for release in releases if release.parsed.prerelease is not None]
+    payload = fetch_releases(
+        args.repo,
+        args.github_token,
+        args.cache_dir,
+        cache_ttl=args.cache_ttl,
+        force_refresh=args.force_refresh,
     )
+    stable, prerelease = pick_latest_by_channel(payload)
 
     if stable is None and prerelease is None:
         print("No releases found; skipping Homebrew cask update.")
@@ -390,19 +524,62 @@ def main() -> int:
     casks_dir.mkdir(parents=True, exist_ok=True)
     sha_cache: dict[str, str] = {}
 
-    stable_changed = False
+    stable_version = None
+    stable_assets: list[ReleaseAsset] = []
     if stable is not None:
         stable_version = version_string(stable.parsed)
-        stable_arm_asset = find_asset(stable, *stable_asset_names(stable_version, "arm64"))
-        stable_intel_asset = find_asset(
-            stable, *stable_asset_names(stable_version, "x64")
-        )
-        stable_arm_sha = sha256_for_asset(
-            stable_arm_asset, github_token=args.github_token, cache=sha_cache
+        stable_assets = [
+            find_asset(stable, *stable_asset_names(stable_version, arch))
+            for arch in ("arm64", "x64")
+        ]
+
+    # Even when beta tracks the stable release, the beta cask installs the separate
+    # Dockmint-Beta zips, so its hashes can never be borrowed from the stable assets.
+    # Identical download URLs are still hashed only once by prefetch_sha256.
+    beta_version = version_string(beta_track.parsed)
+    beta_arm_asset = find_asset(beta_track, *beta_asset_names(beta_version, "arm64"))
+    beta_intel_asset = find_asset(beta_track, *beta_asset_names(beta_version, "x64"))
+
+    selected_assets = [*stable_assets, beta_arm_asset, beta_intel_asset]
+
+    # Checksums from earlier runs cover the same url|size, so reuse them. The casks
+    # in the tap are not consulted: they record a URL but not the size it had, so a
+    # same-name re-upload would keep a stale sha256. Digests from the API still win.
+    sha_cache_path = args.cache_dir / "asset-sha256.json"
+    stored_shas: dict[str, dict] = {}
+    if not args.force_refresh:
+        stored_shas = load_sha_cache(sha_cache_path)
+        sha_cache.update(
+            (key, entry["sha256"]) for key, entry in stored_shas.items()
         )
-        stable_intel_sha = sha256_for_asset(
-            stable_intel_asset, github_token=args.github_token, cache=sha_cache
+
+    # Reported from the API payload alone; cached checksums only save the download.
+    missing_digests = list(
+        dict.fromkeys(asset.name for asset in selected_assets if asset.sha256 is None)
+    )
+    if missing_digests:
+        print(
+            "GitHub API returned no sha256 digest for: " + ", ".join(missing_digests)
         )
+        if args.require_api_digest:
+            raise RuntimeError(
+                "Release assets are missing API digests and --require-api-digest is set"
+            )
+
+    prefetch_sha256(selected_assets, cache=sha_cache)
+    save_sha_cache(
+        sha_cache_path,
+        stored_shas,
+        sha_cache,
+        used={asset_cache_key(asset) for asset in selected_assets},
+    )
+
+    stable_changed = False
+    if stable is not None:
+        assert stable_version is not None
+        stable_arm_asset, stable_intel_asset = stable_assets
+        stable_arm_sha = sha256_for_asset(stable_arm_asset, cache=sha_cache)
+        stable_intel_sha = sha256_for_asset(stable_intel_asset, cache=sha_cache)
         stable_changed = write_if_changed(
             casks_dir / "dockmint.rb",
             render_stable_cask(
@@ -441,15 +618,8 @@ def main() -> int:
     else:
         print("Stable cask unchanged (no stable releases yet)")
 
-    beta_version = version_string(beta_track.parsed)
-    beta_arm_asset = find_asset(beta_track, *beta_asset_names(beta_version, "arm64"))
-    beta_intel_asset = find_asset(beta_track, *beta_asset_names(beta_version, "x64"))
-    beta_arm_sha = sha256_for_asset(
-        beta_arm_asset, github_token=args.github_token, cache=sha_cache
-    )
-    beta_intel_sha = sha256_for_asset(
-        beta_intel_asset, github_token=args.github_token, cache=sha_cache
-    )
+    beta_arm_sha = sha256_for_asset(beta_arm_asset, cache=sha_cache)
+    beta_intel_sha = sha256_for_asset(beta_intel_asset, cache=sha_cache)
     beta_changed = write_if_changed(
         casks_dir / "dockmint@beta.rb",
         render_beta_cask(
@@ -11,22 +11,60 @@ from __future__ import annotations
 
 import argparse
 import base64
+import contextlib
 import dataclasses
 import datetime as dt
-import json
+import functools
+import hashlib
 import os
 import re
+import string
 import subprocess
 import sys
 import tempfile
 import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from email.utils import format_datetime
 from pathlib import Path
 
+from _changelog import extract_notes
+from _files import default_cache_dir, sha256_of_stream, write_if_changed
+from _github import build_api_headers, fetch_releases_payload, parse_sha256_digest
 
-STABLE_TAG_RE = re.compile(r"^v(\d+)\.(\d+)\.(\d+)$")
-PRERELEASE_TAG_RE = re.compile(r"^v(\d+)\.(\d+)\.(\d+)-([0-9A-Za-z.-]+)$")
+
+TAG_RE = re.compile(
+    r"^v(?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+)(?:-(?P<prerelease>[0-9A-Za-z.-]+))?$"
+)
+BETA_RE = re.compile(r"(?:beta|b)[.-]?(\d+)$", re.IGNORECASE)
+PRERELEASE_SEPARATORS = str.maketrans("-", ".")
+MAX_PARALLEL_DOWNLOADS = 4
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+APPCAST_TEMPLATE = string.Template(
+    """<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:sparkle="http://www.andymatuschak.org/xml-namespaces/sparkle">
+  <channel>
+    <title>Dockmint $channel_name Updates</title>
+    <description>Dockmint update feed ($channel_id channel)</description>
+    <language>en</language>
+    <item>
+      <title>Version $update_title</title>
+      <link>$html_url</link>
+      <sparkle:version>$sparkle_version</sparkle:version>
+      <sparkle:shortVersionString>$update_title</sparkle:shortVersionString>
+      <sparkle:minimumSystemVersion>13.0</sparkle:minimumSystemVersion>
+      <sparkle:fullReleaseNotesLink>$changelog_url</sparkle:fullReleaseNotesLink>
+      <description sparkle:format="plain-text"><![CDATA[$notes]]></description>
+      <pubDate>$published</pubDate>
+      <enclosure url="$download_url"$signature_xml
+                 length="$length"
+                 type="application/octet-stream" />
+    </item>
+  </channel>
+</rss>
+"""
+)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -43,6 +81,7 @@ class ReleaseAsset:
     size: int
     api_url: str
     download_url: str
+    sha256: str | None = None
 
 
 @dataclasses.dataclass(frozen=True)
@@ -54,30 +93,26 @@ class Release:
     published_at: str
     assets: tuple[ReleaseAsset, ...]
     parsed: ParsedTag
+    # version_key(parsed), computed once when the release is built.
+    sort_key: tuple = dataclasses.field(compare=False)
 
 
 def parse_tag(tag: str) -> ParsedTag | None:
-    stable = STABLE_TAG_RE.match(tag)
-    if stable:
-        return ParsedTag(
-            int(stable.group(1)), int(stable.group(2)), int(stable.group(3)), None
-        )
-
-    prerelease = PRERELEASE_TAG_RE.match(tag)
-    if prerelease:
-        return ParsedTag(
-            int(prerelease.group(1)),
-            int(prerelease.group(2)),
-            int(prerelease.group(3)),
-            prerelease.group(4),
-        )
-
-    return None
+    match = TAG_RE.match(tag)
+    if match is None:
+        return None
+    return ParsedTag(
+        int(match["major"]),
+        int(match["minor"]),
+        int(match["patch"]),
+        match["prerelease"],
+    )
 
 
+@functools.lru_cache(maxsize=None)
 def prerelease_key(prerelease: str) -> tuple[tuple[int, int | str], ...]:
     tokens: list[tuple[int, int | str]] = []
-    for part in re.split(r"[.-]", prerelease):
+    for part in prerelease.translate(PRERELEASE_SEPARATORS).split("."):
         if part.isdigit():
             tokens.append((0, int(part)))
         else:
@@ -85,6 +120,7 @@ def prerelease_key(prerelease: str) -> tuple[tuple[int, int | str], ...]:
     return tuple(tokens)
 
 
+@functools.lru_cache(maxsize=None)
 def version_key(
     parsed: ParsedTag,
 ) -> tuple[int, int, int, int, tuple[tuple[int, int | str], ...]]:
@@ -98,9 +134,7 @@ def sparkle_build_version(parsed: ParsedTag) -> str:
     if parsed.prerelease is None:
         stage = 90_000
     else:
-        beta_match = re.search(
-            r"(?:beta|b)[.-]?(\d+)$", parsed.prerelease, flags=re.IGNORECASE
-        )
+        beta_match = BETA_RE.search(parsed.prerelease)
         if beta_match:
             stage = max(1, min(int(beta_match.group(1)), 89_999))
         else:
@@ -115,53 +149,18 @@ def short_version(parsed: ParsedTag) -> str:
     return f"{base}-{parsed.prerelease}"
 
 
-def extract_notes(changelog_path: Path, tag: str) -> str:
-    if not changelog_path.exists():
-        raise RuntimeError(f"Missing changelog: {changelog_path}")
-
-    target_heading = f"## [{tag}]"
-    lines = changelog_path.read_text(encoding="utf-8").splitlines()
-
-    start = None
-    for i, line in enumerate(lines):
-        if line.strip() == target_heading:
-            start = i + 1
-            break
-
-    if start is None:
-        raise RuntimeError(f"No changelog heading found for {tag}")
-
-    end = len(lines)
-    for i in range(start, len(lines)):
-        if lines[i].startswith("## ["):
-            end = i
-            break
-
-    section = "\n".join(lines[start:end]).strip()
-    if not section:
-        section = "- Maintenance release."
-    return section
-
-
-def fetch_releases(repo: str, github_token: str | None) -> list[Release]:
-    url = f"https://api.github.com/repos/{repo}/releases"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "dockmint-sparkle-appcast-sync",
-    }
-    if github_token:
-        headers["Authorization"] = f"Bearer {github_token}"
-
-    req = urllib.request.Request(url, headers=headers)
-
-    try:
-        with urllib.request.urlopen(req, timeout=30) as response:
-            payload = json.loads(response.read().decode("utf-8"))
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"Failed to fetch releases from {repo}: {exc}") from exc
+def fetch_releases(
+    repo: str, github_token: str | None, cache_dir: Path | None = None
+) -> list[Release]:
+    headers = build_api_headers(
+        user_agent="dockmint-sparkle-appcast-sync", github_token=github_token
+    )
+    payload = fetch_releases_payload(repo, headers, cache_dir, timeout=30)
 
     releases: list[Release] = []
     for item in payload:
+        if item.get("draft", False):
+            continue
         parsed = parse_tag(item.get("tag_name", ""))
         if parsed is None:
             continue
@@ -172,6 +171,7 @@ def fetch_releases(repo: str, github_token: str | None) -> list[Release]:
                 size=int(asset.get("size", 0)),
                 api_url=str(asset.get("url", "")),
                 download_url=str(asset.get("browser_download_url", "")),
+                sha256=parse_sha256_digest(asset.get("digest")),
             )
             for asset in item.get("assets", [])
         )
@@ -185,16 +185,28 @@ def fetch_releases(repo: str, github_token: str | None) -> list[Release]:
                 published_at=str(item.get("published_at", "")),
                 assets=assets,
                 parsed=parsed,
+                sort_key=version_key(parsed),
             )
         )
 
-    return [release for release in releases if not release.draft]
+    return releases
 
 
-def pick_latest(releases: list[Release]) -> Release | None:
-    if not releases:
-        return None
-    return max(releases, key=lambda release: version_key(release.parsed))
+def pick_latest_by_channel(
+    releases: list[Release],
+) -> tuple[Release | None, Release | None]:
+    """Return the newest stable and newest prerelease in a single pass."""
+    stable: Release | None = None
+    prerelease: Release | None = None
+    stable_key = prerelease_key_value = None
+    for release in releases:
+        key = release.sort_key
+        if release.parsed.prerelease is None:
+            if stable_key is None or key > stable_key:
+                stable, stable_key = release, key
+        elif prerelease_key_value is None or key > prerelease_key_value:
+            prerelease, prerelease_key_value = release, key
+    return stable, prerelease
 
 
 def find_asset(release: Release, *asset_names: str) -> ReleaseAsset:
@@ -332,6 +344,20 @@ def download_asset(
     asset: ReleaseAsset, destination: Path, github_token: str | None = None
 ) -> None:
     destination.parent.mkdir(parents=True, exist_ok=True)
+    etag_path = destination.with_name(f"{destination.name}.etag")
+    digest_path = destination.with_name(f"{destination.name}.sha256")
+
+    # GitHub publishes a sha256 per asset; if it matches the digest recorded when the
+    # cached copy was downloaded, that copy is current and no request is needed. The
+    # signers re-hash the bytes they sign and fetch a fresh copy if they differ.
+    if (
+        asset.sha256 is not None
+        and destination.exists()
+        and destination.stat().st_size == asset.size
+        and digest_path.exists()
+        and digest_path.read_text(encoding="utf-8").strip() == asset.sha256
+    ):
+        return
 
     headers = {"User-Agent": "dockmint-sparkle-signature-sync"}
     download_url = asset.download_url
@@ -343,11 +369,95 @@ def download_asset(
     else:
         headers["Accept"] = "application/octet-stream"
 
+    # A cached copy from an earlier run is only reused once the server confirms its
+    # ETag. That vouches for what was downloaded, not for the file now on disk, so
+    # the copy is also checked against the published digest when there is one.
+    if (
+        destination.exists()
+        and destination.stat().st_size == asset.size
+        and etag_path.exists()
+    ):
+        headers["If-None-Match"] = etag_path.read_text(encoding="utf-8").strip()
+
     request = urllib.request.Request(download_url, headers=headers)
 
-    with urllib.request.urlopen(request, timeout=60) as response:
-        data = response.read()
-    destination.write_bytes(data)
+    # Stream to a sibling file so a failed download never leaves a partial asset behind.
+    partial = destination.with_name(f"{destination.name}.part")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response, partial.open(
+            "wb"
+        ) as handle:
+            digest = hashlib.sha256()
+            while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                handle.write(chunk)
+            etag = response.headers.get("ETag")
+        check_asset_digest(asset, digest.hexdigest())
+        digest_path.unlink(missing_ok=True)
+        os.replace(partial, destination)
+    except urllib.error.HTTPError as exc:
+        partial.unlink(missing_ok=True)
+        if exc.code != 304:
+            raise
+        if asset.sha256 is None:
+            return
+        with destination.open("rb") as handle:
+            if sha256_of_stream(handle) == asset.sha256:
+                digest_path.write_text(asset.sha256, encoding="utf-8")
+                return
+        # The local bytes no longer match: drop the ETag and fetch a full copy.
+        etag_path.unlink(missing_ok=True)
+        download_asset(asset, destination, github_token=github_token)
+        return
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    if etag:
+        etag_path.write_text(etag, encoding="utf-8")
+    else:
+        etag_path.unlink(missing_ok=True)
+    digest_path.write_text(digest.hexdigest(), encoding="utf-8")
+
+
+def check_asset_digest(asset: ReleaseAsset, actual: str) -> None:
+    if asset.sha256 is not None and actual != asset.sha256:
+        raise RuntimeError(
+            f"sha256 of {asset.name} is {actual}, but GitHub reports {asset.sha256}"
+        )
+
+
+def refetch_if_corrupt(
+    asset: ReleaseAsset, path: Path, actual: str, github_token: str | None
+) -> bool:
+    """Replace a cached asset whose bytes differ from its published digest.
+
+    Returns True when the file was downloaded again; download_asset verifies the
+    fresh copy and raises if GitHub serves bytes that do not match either.
+    """
+    if asset.sha256 is None or actual == asset.sha256:
+        return False
+    print(f"Cached {asset.name} does not match its published sha256; downloading it again.")
+    for suffix in ("", ".etag", ".sha256"):
+        path.with_name(f"{path.name}{suffix}").unlink(missing_ok=True)
+    download_asset(asset, path, github_token=github_token)
+    return True
+
+
+def asset_cache_dir(cache_dir: Path) -> Path:
+    # Downloads get a directory of their own, so pruning can never reach files the
+    # script did not create, even when --cache-dir points at a shared location.
+    return cache_dir / "assets"
+
+
+def prune_asset_cache(asset_dir: Path, keep: set[str]) -> None:
+    """Drop cached release zips (and their sidecars) that are no longer signed."""
+    for path in asset_dir.glob("*.zip*"):
+        name = path.name
+        for suffix in (".etag", ".sha256", ".part"):
+            name = name.removesuffix(suffix)
+        if name.endswith(".zip") and name not in keep and path.is_file():
+            path.unlink(missing_ok=True)
 
 
 def sign_asset(
@@ -358,10 +468,13 @@ def sign_asset(
 ) -> str:
     path = cache_dir / asset.name
 
-    if not path.exists() or path.stat().st_size != asset.size:
-        download_asset(asset, path, github_token=github_token)
+    download_asset(asset, path, github_token=github_token)
 
     payload = path.read_bytes()
+    if refetch_if_corrupt(
+        asset, path, hashlib.sha256(payload).hexdigest(), github_token
+    ):
+        payload = path.read_bytes()
     signature = private_key.sign(payload)
     return base64.b64encode(signature).decode("ascii")
 
@@ -375,8 +488,11 @@ def sign_asset_with_sparkle_tool(
 ) -> str:
     path = cache_dir / asset.name
 
-    if not path.exists() or path.stat().st_size != asset.size:
-        download_asset(asset, path, github_token=github_token)
+    download_asset(asset, path, github_token=github_token)
+    if asset.sha256 is not None:
+        with path.open("rb") as handle:
+            actual = sha256_of_stream(handle)
+        refetch_if_corrupt(asset, path, actual, github_token)
 
     with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False) as key_file:
         key_file.write(signing_secret)
@@ -420,46 +536,28 @@ def render_appcast(
     notes: str,
     signature: str | None,
 ) -> str:
-    update_title = short_version(release.parsed)
-    sparkle_version = sparkle_build_version(release.parsed)
-    published = to_rfc2822(release.published_at)
-    escaped_notes = notes.replace("]]>", "]]]]><![CDATA[>")
-    changelog_url = f"https://github.com/{repo}/blob/main/CHANGELOG.md"
+    escaped_notes = notes
+    if "]]>" in notes:
+        escaped_notes = notes.replace("]]>", "]]]]><![CDATA[>")
 
     signature_xml = ""
     if signature:
         signature_xml = f'\n                 sparkle:edSignature="{signature}"'
 
-    return f"""<?xml version=\"1.0\" encoding=\"utf-8\"?>
-<rss version=\"2.0\" xmlns:sparkle=\"http://www.andymatuschak.org/xml-namespaces/sparkle\">
-  <channel>
-    <title>Dockmint {channel_name} Updates</title>
-    <description>Dockmint update feed ({channel_name.lower()} channel)</description>
-    <language>en</language>
-    <item>
-      <title>Version {update_title}</title>
-      <link>{release.html_url}</link>
-      <sparkle:version>{sparkle_version}</sparkle:version>
-      <sparkle:shortVersionString>{update_title}</sparkle:shortVersionString>
-      <sparkle:minimumSystemVersion>13.0</sparkle:minimumSystemVersion>
-      <sparkle:fullReleaseNotesLink>{changelog_url}</sparkle:fullReleaseNotesLink>
-      <description sparkle:format=\"plain-text\"><![CDATA[{escaped_notes}]]></description>
-      <pubDate>{published}</pubDate>
-      <enclosure url=\"{asset.download_url}\"{signature_xml}
-                 length=\"{asset.size}\"
-                 type=\"application/octet-stream\" />
-    </item>
-  </channel>
-</rss>
-"""
-
-
-def write_if_changed(path: Path, content: str) -> bool:
-    existing = path.read_text(encoding="utf-8") if path.exists() else None
-    if existing == content:
-        return False
-    path.write_text(content, encoding="utf-8")
-    return True
+    update_title = short_version(release.parsed)
+    return APPCAST_TEMPLATE.substitute(
+        channel_name=channel_name,
+        channel_id=channel_name.lower(),
+        update_title=update_title,
+        html_url=release.html_url,
+        sparkle_version=sparkle_build_version(release.parsed),
+        changelog_url=f"https://github.com/{repo}/blob/main/CHANGELOG.md",
+        notes=escaped_notes,
+        published=to_rfc2822(release.published_at),
+        download_url=asset.download_url,
+        signature_xml=signature_xml,
+        length=asset.size,
+    )
 
 
 def main() -> int:
@@ -501,6 +599,17 @@ def main() -> int:
         default=None,
         help="Optional path to Sparkle's sign_update tool for signing appcasts using Sparkle-native key handling",
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=default_cache_dir("dockmint-sparkle"),
+        help="Directory where the releases list and, under assets/, downloaded release assets are kept between runs (defaults to $XDG_CACHE_HOME/dockmint-sparkle)",
+    )
+    parser.add_argument(
+        "--no-persistent-cache",
+        action="store_true",
+        help="Always fetch the full releases list and download release assets into a temporary directory that is removed after signing",
+    )
     args = parser.parse_args()
 
     github_token = args.github_token or os.environ.get("GITHUB_TOKEN")
@@ -543,15 +652,15 @@ def main() -> int:
             "Missing Sparkle private key. Set SPARKLE_PRIVATE_ED_KEY or --sparkle-private-key."
         )
 
-    releases = fetch_releases(args.repo, github_token)
-
-    stable = pick_latest(
-        [release for release in releases if release.parsed.prerelease is None]
-    )
-    prerelease = pick_latest(
-        [release for release in releases if release.parsed.prerelease is not None]
+    releases = fetch_releases(
+        args.repo,
+        github_token,
+        cache_dir=None if args.no_persistent_cache else args.cache_dir,
     )
 
+    # GitHub lists releases by creation date, not version, so compare every tag.
+    stable, prerelease = pick_latest_by_channel(releases)
+
     if stable is None and prerelease is None:
         print("No releases found; skipping appcast generation.")
         return 0
@@ -561,9 +670,7 @@ def main() -> int:
             "At least one stable release is required for stable appcast generation"
         )
 
-    if prerelease is not None and version_key(prerelease.parsed) > version_key(
-        stable.parsed
-    ):
+    if prerelease is not None and prerelease.sort_key > stable.sort_key:
         beta_track = prerelease
     else:
         beta_track = stable
@@ -587,40 +694,50 @@ def main() -> int:
     stable_notes = extract_notes(args.changelog, stable.tag_name)
     beta_notes = extract_notes(args.changelog, beta_track.tag_name)
 
-    signatures: dict[str, str] = {}
+    sign = None
     if private_key is not None:
-        with tempfile.TemporaryDirectory(
-            prefix="dockmint-sparkle-sign-"
-        ) as temp_dir:
-            cache_dir = Path(temp_dir)
-            unique_assets = {
-                stable_arm_asset.name: stable_arm_asset,
-                stable_x64_asset.name: stable_x64_asset,
-                beta_arm_asset.name: beta_arm_asset,
-                beta_x64_asset.name: beta_x64_asset,
-            }
-            for asset in unique_assets.values():
-                signatures[asset.name] = sign_asset(
-                    asset, private_key, cache_dir, github_token=github_token
-                )
+        sign = functools.partial(
+            sign_asset, private_key=private_key, github_token=github_token
+        )
     elif normalized_signing_secret is not None and sign_update_bin is not None:
-        with tempfile.TemporaryDirectory(
-            prefix="dockmint-sparkle-sign-"
-        ) as temp_dir:
-            cache_dir = Path(temp_dir)
-            unique_assets = {
-                stable_arm_asset.name: stable_arm_asset,
-                stable_x64_asset.name: stable_x64_asset,
-                beta_arm_asset.name: beta_arm_asset,
-                beta_x64_asset.name: beta_x64_asset,
-            }
-            for asset in unique_assets.values():
-                signatures[asset.name] = sign_asset_with_sparkle_tool(
-                    asset,
-                    normalized_signing_secret,
-                    sign_update_bin,
-                    cache_dir,
-                    github_token=github_token,
+        sign = functools.partial(
+            sign_asset_with_sparkle_tool,
+            signing_secret=normalized_signing_secret,
+            sign_update_bin=sign_update_bin,
+            github_token=github_token,
+        )
+
+    # Unsigned runs never download assets or touch the asset cache: signatures stays
+    # empty and render_appcast leaves out the sparkle:edSignature attribute.
+    signatures: dict[str, str] = {}
+    if sign is not None:
+        unique_assets = {
+            stable_arm_asset.name: stable_arm_asset,
+            stable_x64_asset.name: stable_x64_asset,
+            beta_arm_asset.name: beta_arm_asset,
+            beta_x64_asset.name: beta_x64_asset,
+        }
+        if args.no_persistent_cache:
+            cache_context = tempfile.TemporaryDirectory(prefix="dockmint-sparkle-sign-")
+        else:
+            asset_dir = asset_cache_dir(args.cache_dir)
+            asset_dir.mkdir(parents=True, exist_ok=True)
+            prune_asset_cache(asset_dir, keep=set(unique_assets))
+            cache_context = contextlib.nullcontext(str(asset_dir))
+        with cache_context as cache_root:
+            cache_dir = Path(cache_root)
+            # Each asset downloads to its own file, so the workers never collide.
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_PARALLEL_DOWNLOADS, len(unique_assets))
+            ) as executor:
+                signatures.update(
+                    zip(
+                        unique_assets,
+                        executor.map(
+                            lambda asset: sign(asset, cache_dir=cache_dir),
+                            unique_assets.values(),
+                        ),
+                    )
                 )
 
     appcasts = {
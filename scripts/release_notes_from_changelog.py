@@ -3,35 +3,12 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "release"))
 
-def extract_notes(changelog_path: Path, tag: str) -> str:
-    if not changelog_path.exists():
-        raise RuntimeError(f"Missing changelog: {changelog_path}")
-
-    target_heading = f"## [{tag}]"
-    lines = changelog_path.read_text(encoding="utf-8").splitlines()
-
-    start = None
-    for i, line in enumerate(lines):
-        if line.strip() == target_heading:
-            start = i + 1
-            break
-
-    if start is None:
-        raise RuntimeError(f"No changelog heading found for {tag}")
-
-    end = len(lines)
-    for i in range(start, len(lines)):
-        if lines[i].startswith("## ["):
-            end = i
-            break
-
-    section = "\n".join(lines[start:end]).strip()
-    if not section:
-        section = "- Maintenance release."
-    return section
+from _changelog import extract_notes
 
 
 def main() -> int: